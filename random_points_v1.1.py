@@ -29,6 +29,8 @@
 #----           p_min_dist:         Minimum distance among points [meters] (If the zone area is too small, the number of points will reduced to fit the p_min_dist)
 #----           T_ID:               Is the number index of where the field name is in the shapefile name (e.g. for file 'BRA_SUGARCANE_RAIZEN_FARM1_T01_2018JUL16.shp' the T_ID = 5)
 #----           utm_code:           Is the UTM projection code in QGIS (e.g. 'EPSG:32722' = UTM_22_S; 'EPSG:4326' = WGS84)
+#----           use_raster:         If True, each zone is rasterized and the border buffer, zone area and points placement are done on the raster mask (faster for zones with stair-stepped borders)
+#----           raster_res:         Pixel size of the zone raster mask [meters] (only used when use_raster = True)
 #----       After Setting up parameters press 'Run Script'
 
 #--- Contact:
@@ -51,6 +53,8 @@ pdist_red               = 0.75                   #[0-1]
 p_min_dist          = 10                    #[METERS]
 T_ID                = 5                     #[#]
 utm_code            = 'EPSG:32722'          #[Projection Code]
+use_raster          = False                 #[True/False]
+raster_res          = 1.0                   #[METERS]
 
 #--- Ready to Run? 
 #--- Please press 'Run Script'
@@ -76,7 +80,8 @@ utm_code            = 'EPSG:32722'          #[Projection Code]
 #-------------------------------------------------------------------------------------------------------------------------------------------
 
 #--- Load modules
-import os, gc, ogr, processing,math,subprocess,sys
+import os, gc, ogr, osr, gdal, processing,math,subprocess,sys,numpy
+from processing.tools.system import getTempFilename
 
 #--- Check parameters
 wrong_par = False
@@ -89,6 +94,10 @@ if not os.path.isdir(wd_p):
     msg = 'Random points directory do not exist. Please check directory folder path (wd_p)'
     wrong_par = True
 
+if use_raster and raster_res <= 0:
+    msg = 'Raster resolution must be higher than zero. Please check the raster resolution (raster_res)'
+    wrong_par = True
+
 #--- functions:
 def UIerrorSwitch(supress_win_promp):
     filename_reg = wd_p+'/'+'UIon_off.reg'
@@ -104,6 +113,103 @@ def UIerrorSwitch(supress_win_promp):
     os.remove(filename_reg)
     return
 
+def zoneRaster(z_lyr, res):
+    #--- Rasterize the zone (UTM) and compute the distance of each zone pixel to the zone border
+    #--- Returns the zone mask, the distance to border [meters] and the raster geotransform
+    ds_v = ogr.Open(z_lyr.source().split('|')[0])
+    v_lyr = ds_v.GetLayer()
+    xmin, xmax, ymin, ymax = v_lyr.GetExtent()
+
+    #--- one pixel of margin to assure the border is always outside the zone
+    ncol = int(math.ceil((xmax - xmin) / res)) + 2
+    nrow = int(math.ceil((ymax - ymin) / res)) + 2
+    gt = (xmin - res, res, 0, ymax + res, 0, -res)
+
+    ds_m = gdal.GetDriverByName('MEM').Create('', ncol, nrow, 1, gdal.GDT_Byte)
+    ds_m.SetGeoTransform(gt)
+    gdal.RasterizeLayer(ds_m, [1], v_lyr, burn_values=[1])
+
+    #--- Euclidean distance to the nearest pixel outside the zone
+    ds_d = gdal.GetDriverByName('MEM').Create('', ncol, nrow, 1, gdal.GDT_Float32)
+    ds_d.SetGeoTransform(gt)
+    gdal.ComputeProximity(ds_m.GetRasterBand(1), ds_d.GetRasterBand(1), ['VALUES=0', 'DISTUNITS=GEO'])
+
+    z_mask = ds_m.GetRasterBand(1).ReadAsArray() == 1
+    z_dist = ds_d.GetRasterBand(1).ReadAsArray() - res / 2. # distance from pixel center to the border
+    z_dist[~z_mask] = 0
+
+    ds_v = None
+    ds_m = None
+    ds_d = None
+    return z_mask, z_dist, gt
+
+def rasterRandomPoints(buf_mask, gt, npoints, pdist, lyr_nm):
+    #--- Place up to npoints random points within the buffered zone mask keeping a minimum distance (pdist) among points
+    #--- Candidates are drawn within the mask extent and accepted by a mask lookup
+    res = gt[1]
+    rows, cols = numpy.nonzero(buf_mask)
+    xmin = gt[0] + cols.min() * res
+    xmax = gt[0] + (cols.max() + 1) * res
+    ymax = gt[3] - rows.min() * res
+    ymin = gt[3] - (rows.max() + 1) * res
+
+    #--- same maximum number of attempts as qgis:randompointsinsidepolygonsfixed
+    max_try = npoints * 200
+    x_c = numpy.random.uniform(xmin, xmax, max_try)
+    y_c = numpy.random.uniform(ymin, ymax, max_try)
+    c_col = numpy.minimum(((x_c - gt[0]) / res).astype(int), buf_mask.shape[1] - 1)
+    c_row = numpy.minimum(((gt[3] - y_c) / res).astype(int), buf_mask.shape[0] - 1)
+    in_zone = buf_mask[c_row, c_col]
+    x_c = x_c[in_zone]
+    y_c = y_c[in_zone]
+
+    pts_x = numpy.empty(npoints)
+    pts_y = numpy.empty(npoints)
+    k = 0
+    for i in range(0, len(x_c)):
+        if k >= npoints:
+            break
+        if k > 0:
+            d2 = (pts_x[:k] - x_c[i])**2 + (pts_y[:k] - y_c[i])**2
+            if d2.min() < pdist**2:
+                continue
+        pts_x[k] = x_c[i]
+        pts_y[k] = y_c[i]
+        k = k + 1
+
+    #--- Write points to a temporary shapefile with the same "id" field of qgis:randompointsinsidepolygonsfixed
+    out_shp = getTempFilename('shp')
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(int(utm_code.split(':')[1]))
+    ds_p = ogr.GetDriverByName('ESRI Shapefile').CreateDataSource(out_shp)
+    p_lyr = ds_p.CreateLayer('points', srs, ogr.wkbPoint)
+    p_lyr.CreateField(ogr.FieldDefn('id', ogr.OFTInteger))
+    for i in range(0, k):
+        feat = ogr.Feature(p_lyr.GetLayerDefn())
+        feat.SetField('id', i)
+        pt = ogr.Geometry(ogr.wkbPoint)
+        pt.AddPoint(float(pts_x[i]), float(pts_y[i]))
+        feat.SetGeometry(pt)
+        p_lyr.CreateFeature(feat)
+        feat = None
+    ds_p = None
+    return QgsVectorLayer(out_shp, lyr_nm, "ogr")
+
+def randomPoints(npoints, pdist, lyr_nm):
+    #--- Random points within the buffered zone of the current zone (raster mask or vector layer)
+    if use_raster:
+        return rasterRandomPoints(buf_mask, z_gt, npoints, pdist, lyr_nm)
+    return vectorRandomPoints(buf_dif_diss, npoints, pdist, lyr_nm)
+
+def vectorRandomPoints(z_lyr, npoints, pdist, lyr_nm):
+    #--- Place up to npoints random points within the buffered zone layer keeping a minimum distance (pdist) among points
+    return QgsVectorLayer(processing.runalg("qgis:randompointsinsidepolygonsfixed",
+    z_lyr,
+    0,
+    npoints,
+    pdist,
+    None)['OUTPUT'], lyr_nm,"ogr")
+
 #--- list of all zoning shapefiles within (wd_z)
 input_zon = []
 filename = []
@@ -189,34 +295,45 @@ for shp in range(0,len(input_zon)):
         0.25,
         None)['OUTPUT_LAYER'],('zon_smo_'+str(zn)+'_'+filename[shp]),"ogr")
         
-        #--- Recompute polyarea
-        formula = "area(transform($geometry,'EPSG:4326','"+utm_code+"')) * 0.000247105"
-        z_lyr_cor_pa = QgsVectorLayer(processing.runalg("qgis:fieldcalculator",
-        z_lyr_smo,
-        'PolyArea',
-        0,
-        15,
-        2,
-        0,
-        formula, #IN ACRES
-        None)['OUTPUT_LAYER'], ('zon_polyarea'+str(zn)+'_'+filename[shp]),"ogr")
+        if use_raster:
+            #--- reproject vector to UTM and rasterize the zone
+            z_lyr_utm = QgsVectorLayer(processing.runalg("qgis:reprojectlayer",
+            z_lyr_smo,
+            utm_code,
+            None)['OUTPUT'],('zon_utm_'+str(zn)+'_'+filename[shp]),"ogr")
+            z_mask, z_dist, z_gt = zoneRaster(z_lyr_utm, raster_res)
+            
+            #--- Zone area from pixel count
+            z_area = numpy.count_nonzero(z_mask) * raster_res * raster_res * 0.000247105 #IN ACRES
+        else:
+            #--- Recompute polyarea
+            formula = "area(transform($geometry,'EPSG:4326','"+utm_code+"')) * 0.000247105"
+            z_lyr_cor_pa = QgsVectorLayer(processing.runalg("qgis:fieldcalculator",
+            z_lyr_smo,
+            'PolyArea',
+            0,
+            15,
+            2,
+            0,
+            formula, #IN ACRES
+            None)['OUTPUT_LAYER'], ('zon_polyarea'+str(zn)+'_'+filename[shp]),"ogr")
         
-        #--- recompute ZoneArea (needed because correction may created/deleted polygons)
-        z_lyr_cor_za = QgsVectorLayer(processing.runalg("qgis:fieldcalculator",
-        z_lyr_cor_pa,
-        'ZoneArea',
-        0,
-        15,
-        2,
-        0,
-        'sum( "PolyArea")', #IN ACRES
-        None)['OUTPUT_LAYER'], ('zon_zonearea'+str(zn)+'_'+filename[shp]),"ogr")
+            #--- recompute ZoneArea (needed because correction may created/deleted polygons)
+            z_lyr_cor_za = QgsVectorLayer(processing.runalg("qgis:fieldcalculator",
+            z_lyr_cor_pa,
+            'ZoneArea',
+            0,
+            15,
+            2,
+            0,
+            'sum( "PolyArea")', #IN ACRES
+            None)['OUTPUT_LAYER'], ('zon_zonearea'+str(zn)+'_'+filename[shp]),"ogr")
         
-        #--- Read shapefile zonearea
-        zones_area   = []
-        for feature in z_lyr_cor_za.getFeatures():
-            zones_area.append(feature["ZoneArea"])
-        z_area = zones_area[0]
+            #--- Read shapefile zonearea
+            zones_area   = []
+            for feature in z_lyr_cor_za.getFeatures():
+                zones_area.append(feature["ZoneArea"])
+            z_area = zones_area[0]
         
         #--- check if the zonning area has signinficant size
         print('Zone '+str(zn)+' Area: '+str(round(z_area,2))+' Acres')
@@ -227,121 +344,210 @@ for shp in range(0,len(input_zon)):
             continue
         
         #--- reproject vector to UTM
-        z_lyr_utm = QgsVectorLayer(processing.runalg("qgis:reprojectlayer",
-        z_lyr_cor_za,
-        utm_code,
-        None)['OUTPUT'],('zon_utm_'+str(zn)+'_'+filename[shp]),"ogr")
-        
-        #--- try the first inner buffer with initial distance
-        distbuf = init_buf
-        file_exist = False
-        
-        #--- Reduce buffer distance if "saga:shapesbufferfixeddistance" fails
-        ##TRY TO MAKE THIS AN ERROR OR SUPPRESS WINDOWS ERROR
-        while not file_exist:
-            UIerrorSwitch(True)
-            outnm_del = 'init_buf_'+str(round(distbuf,2))+'_Zone_'+str(zn)+'_'+filename[shp]
-            init_buf_str = processing.runalg("saga:shapesbufferfixeddistance",
-            z_lyr_utm,
-            distbuf,
-            1,
-            5,
-            0,
-            1,
-            None)['BUFFER']
-            UIerrorSwitch(False)
-            #--- Check whether the file was created
-            z_lyr_buf_1 = QgsVectorLayer(init_buf_str, "BUFFER", "ogr")
+        if not use_raster:
+            z_lyr_utm = QgsVectorLayer(processing.runalg("qgis:reprojectlayer",
+            z_lyr_cor_za,
+            utm_code,
+            None)['OUTPUT'],('zon_utm_'+str(zn)+'_'+filename[shp]),"ogr")
+        
+        if use_raster:
+            #--- Inner buffer from the distance to border (zone pixels with distance >= distbuf)
+            z_dpix = z_dist[z_mask]
+            distbuf = init_buf
+            bf_fac = float(numpy.count_nonzero(z_dpix >= distbuf)) / len(z_dpix)
+            if round(bf_fac,2) < red_t:
+                #--- Largest distance that keeps red_t of the original Zone area
+                k_top = max(1, int(math.ceil(red_t * len(z_dpix))))
+                distbuf = float(numpy.partition(z_dpix, len(z_dpix) - k_top)[len(z_dpix) - k_top])
+                print('Area reduced to more than ' +str(round((1.-red_t)*100,1))+ '% of original Zone Area ')
+                print('Distance Buffer Reduced to:'+str(round(distbuf,2))+' meters')
+                if distbuf < min_buf:
+                    #--- This zone is too small
+                    print('Zone '+str(zn)+' is too small: Skipped!')
+                    continue
             
-            if z_lyr_buf_1.isValid():
-                file_exist = True
+            buf_mask = z_mask & (z_dist >= distbuf)
+            if not buf_mask.any():
+                print('Zone '+str(zn)+' is too small, skipping to next Zone')
+                print('Zone '+str(zn)+' of file '+filename[shp]+' has no points')
+                continue
+            bufdif_area = numpy.count_nonzero(buf_mask) * raster_res * raster_res * 0.000247105 #IN ACRES
+            print('New Reduced area is: '+str(round(bufdif_area,2))+' Acres')
+            print('Buffer distance used: '+str(round(distbuf,2))+' meters')
             
-            if not file_exist:
-                distbuf = distbuf * 0.75 # reduce the inital buffer into 25% for this first assessment
-                print('Initial Buffer distance is too high for this Zone')
-                print('Buffer distance reduced to: '+str(round(distbuf,2))+' meters')
+            #--- run the random points for this reduced zone
+            #--- Estimate an initial distance among points
+            rows, cols = numpy.nonzero(buf_mask)
+            x_dist = (cols.max() - cols.min() + 1) * raster_res
+            y_dist = (rows.max() - rows.min() + 1) * raster_res
+        else:
+            #--- try the first inner buffer with initial distance
+            distbuf = init_buf
+            file_exist = False
+        
+            #--- Reduce buffer distance if "saga:shapesbufferfixeddistance" fails
+            ##TRY TO MAKE THIS AN ERROR OR SUPPRESS WINDOWS ERROR
+            while not file_exist:
+                UIerrorSwitch(True)
+                outnm_del = 'init_buf_'+str(round(distbuf,2))+'_Zone_'+str(zn)+'_'+filename[shp]
+                init_buf_str = processing.runalg("saga:shapesbufferfixeddistance",
+                z_lyr_utm,
+                distbuf,
+                1,
+                5,
+                0,
+                1,
+                None)['BUFFER']
+                UIerrorSwitch(False)
+                #--- Check whether the file was created
+                z_lyr_buf_1 = QgsVectorLayer(init_buf_str, "BUFFER", "ogr")
+            
+                if z_lyr_buf_1.isValid():
+                    file_exist = True
+            
+                if not file_exist:
+                    distbuf = distbuf * 0.75 # reduce the inital buffer into 25% for this first assessment
+                    print('Initial Buffer distance is too high for this Zone')
+                    print('Buffer distance reduced to: '+str(round(distbuf,2))+' meters')
         
-        print('Buffer distance used: '+str(round(distbuf,2))+' meters')
+            print('Buffer distance used: '+str(round(distbuf,2))+' meters')
         
-        #--- Separate single polygons to multipolygons (To correct geometries)
-        z_lyr_buf1_mpsp =QgsVectorLayer(processing.runalg("qgis:multiparttosingleparts",      #Algorithm
-        z_lyr_buf_1,
-        None)['OUTPUT'], ('zon_buf1_mpsp'+str(zn)+'_'+filename[shp]),"ogr")
+            #--- Separate single polygons to multipolygons (To correct geometries)
+            z_lyr_buf1_mpsp =QgsVectorLayer(processing.runalg("qgis:multiparttosingleparts",      #Algorithm
+            z_lyr_buf_1,
+            None)['OUTPUT'], ('zon_buf1_mpsp'+str(zn)+'_'+filename[shp]),"ogr")
         
-        z_lyr_buf_1_corr =QgsVectorLayer(processing.runalg("gdalogr:buffervectors",      #Algorithm
-        z_lyr_buf1_mpsp,
-        'geometry',
-        0.0,
-        0,
-        None,
-        0,
-        None,
-        None)['OUTPUT_LAYER'],('zon_buf1_corr'+str(zn)+'_'+filename[shp]),"ogr")
+            z_lyr_buf_1_corr =QgsVectorLayer(processing.runalg("gdalogr:buffervectors",      #Algorithm
+            z_lyr_buf1_mpsp,
+            'geometry',
+            0.0,
+            0,
+            None,
+            0,
+            None,
+            None)['OUTPUT_LAYER'],('zon_buf1_corr'+str(zn)+'_'+filename[shp]),"ogr")
         
-        #--- dissolve the result because some features might be ruled out
-        z_lyr_buf_1_diss = QgsVectorLayer(processing.runalg("qgis:dissolve",
-        z_lyr_buf_1_corr,
-        1,
-        'ZoneID',
-        None)['OUTPUT'], ('zon_initbuf_dissolve_'+str(zn)+'_'+filename[shp]),"ogr")
+            #--- dissolve the result because some features might be ruled out
+            z_lyr_buf_1_diss = QgsVectorLayer(processing.runalg("qgis:dissolve",
+            z_lyr_buf_1_corr,
+            1,
+            'ZoneID',
+            None)['OUTPUT'], ('zon_initbuf_dissolve_'+str(zn)+'_'+filename[shp]),"ogr")
         
-        #--- Recompute polyArea (needed because correction may created/deleted polygons)
-        z_lyr_buf_pa = QgsVectorLayer(processing.runalg("qgis:fieldcalculator",
-        z_lyr_buf_1_diss,
-        'PolyArea',
-        0,
-        15,
-        4,
-        1,
-        "$area * 0.000247105", #IN ACRES
-        None)['OUTPUT_LAYER'], ('zon_bf1_diss_pa_'+str(zn)+'_'+filename[shp]),"ogr")
-        
-        #--- Read buffer area
-        buf_area   = []
-        for feature in z_lyr_buf_pa.getFeatures():
-            buf_area.append(feature["PolyArea"])
-        buf_area = sum(buf_area)
-        
-        #--- Check If new area was not reduced more than red_threshold from original Zone area
-        bufdif_area = max(0, z_area - buf_area)
-        if distbuf == 0 or z_area == 0:
-            print('Distance buffer or Zone area equal to zero, skiping this zone')
-            skip_zone = True
-            continue
-        bf_rate = (z_area - bufdif_area) / (0 - distbuf)
-        bf_fac = (bufdif_area / z_area)
-        red_threshold = red_t
-        print('New Reduced area is: '+str(round(bufdif_area,2))+' Acres')
-        n_it = 0
-        while(round(bf_fac,2) < red_threshold):
-            #--- Reduce buffer distance
-            distbuf = -(z_area * (1-red_threshold)) / bf_rate
+            #--- Recompute polyArea (needed because correction may created/deleted polygons)
+            z_lyr_buf_pa = QgsVectorLayer(processing.runalg("qgis:fieldcalculator",
+            z_lyr_buf_1_diss,
+            'PolyArea',
+            0,
+            15,
+            4,
+            1,
+            "$area * 0.000247105", #IN ACRES
+            None)['OUTPUT_LAYER'], ('zon_bf1_diss_pa_'+str(zn)+'_'+filename[shp]),"ogr")
+        
+            #--- Read buffer area
+            buf_area   = []
+            for feature in z_lyr_buf_pa.getFeatures():
+                buf_area.append(feature["PolyArea"])
+            buf_area = sum(buf_area)
+        
+            #--- Check If new area was not reduced more than red_threshold from original Zone area
+            bufdif_area = max(0, z_area - buf_area)
+            if distbuf == 0 or z_area == 0:
+                print('Distance buffer or Zone area equal to zero, skiping this zone')
+                skip_zone = True
+                continue
+            bf_rate = (z_area - bufdif_area) / (0 - distbuf)
+            bf_fac = (bufdif_area / z_area)
+            red_threshold = red_t
+            print('New Reduced area is: '+str(round(bufdif_area,2))+' Acres')
+            n_it = 0
+            while(round(bf_fac,2) < red_threshold):
+                #--- Reduce buffer distance
+                distbuf = -(z_area * (1-red_threshold)) / bf_rate
             
-            if(distbuf < min_buf):
-                if n_it == 0:
-                    #--- This zone is too small
-                    print('Zone '+str(zn)+' is too small: Skipped!')
-                    skip_zone = True
-                    break
+                if(distbuf < min_buf):
+                    if n_it == 0:
+                        #--- This zone is too small
+                        print('Zone '+str(zn)+' is too small: Skipped!')
+                        skip_zone = True
+                        break
+                
+                    print('Minimum buffer distance reached ('+str(min_buf)+'m): Proceed to Random Points')
+                    log_msg = 'Minimum buffer distance reached ('+str(min_buf)+'m) in Zone '+str(zn)+' file: '+filename[shp]
+                    distbuf = min_buf
+                    #--- Buffer with reduced distance
+                    z_lyr_buf_it = QgsVectorLayer(processing.runalg("saga:shapesbufferfixeddistance",
+                    z_lyr_utm,
+                    distbuf,
+                    1,
+                    5,
+                    0,
+                    1,
+                    None)['BUFFER'], ('zon_buf2_reduced_to_'+str(round(distbuf,2))+'_Zone_'+str(zn)+'_'+filename[shp]),"ogr")
+                
+                    #--- Separate single polygons to multipolygons (To correct geometries)
+                    z_lyr_buf_it_mpsp =QgsVectorLayer(processing.runalg("qgis:multiparttosingleparts",      #Algorithm
+                    z_lyr_buf_it,
+                    None)['OUTPUT'], ('zon_buf_it_mpsp'+str(zn)+'_'+filename[shp]),"ogr")
+                
+                    z_lyr_buf_it_corr =QgsVectorLayer(processing.runalg("gdalogr:buffervectors",      #Algorithm
+                    z_lyr_buf_it_mpsp,
+                    'geometry',
+                    0.0,
+                    0,
+                    None,
+                    0,
+                    None,
+                    None)['OUTPUT_LAYER'],('zon_buf1_corr'+str(zn)+'_'+filename[shp]),"ogr")
+                
+                    #--- dissolve the result because some features might be ruled out
+                    z_lyr_buf_it_diss = QgsVectorLayer(processing.runalg("qgis:dissolve",
+                    z_lyr_buf_it_corr,
+                    1,
+                    'ZoneID',
+                    None)['OUTPUT'], ('zon_initbuf_dissolve_'+str(zn)+'_'+filename[shp]),"ogr")
                 
-                print('Minimum buffer distance reached ('+str(min_buf)+'m): Proceed to Random Points')
-                log_msg = 'Minimum buffer distance reached ('+str(min_buf)+'m) in Zone '+str(zn)+' file: '+filename[shp]
-                distbuf = min_buf
+                    #--- recompute polyArea (needed because correction may created/deleted polygons)
+                    z_lyr_buf_pa = QgsVectorLayer(processing.runalg("qgis:fieldcalculator",
+                    z_lyr_buf_it_diss,
+                    'PolyArea',
+                    0,
+                    15,
+                    4,
+                    1,
+                    "$area * 0.000247105", #IN ACRES
+                    None)['OUTPUT_LAYER'], ('zon_parea_reduced_to_'+str(round(distbuf,2))+'_Zone_'+str(zn)+'_'+filename[shp]),"ogr")
+                
+                    #--- Read difference area
+                    buf_area   = []
+                    for feature in z_lyr_buf_pa.getFeatures():
+                        buf_area.append(feature["PolyArea"])
+                    buf_area = sum(buf_area)
+                    bufdif_area = max(0, z_area - buf_area)
+                    if distbuf == 0 or z_area == 0:
+                        print('Distance buffer or Zone area equal to zero, skiping this zone')
+                        skip_zone = True
+                        continue
+                    bf_rate = (z_area - bufdif_area) / (0 - distbuf)
+                    bf_fac = (bufdif_area / z_area)                
+                    break
+            
                 #--- Buffer with reduced distance
                 z_lyr_buf_it = QgsVectorLayer(processing.runalg("saga:shapesbufferfixeddistance",
                 z_lyr_utm,
-                distbuf,
+                round(distbuf,2),
                 1,
                 5,
                 0,
                 1,
                 None)['BUFFER'], ('zon_buf2_reduced_to_'+str(round(distbuf,2))+'_Zone_'+str(zn)+'_'+filename[shp]),"ogr")
-                
+            
                 #--- Separate single polygons to multipolygons (To correct geometries)
                 z_lyr_buf_it_mpsp =QgsVectorLayer(processing.runalg("qgis:multiparttosingleparts",      #Algorithm
                 z_lyr_buf_it,
                 None)['OUTPUT'], ('zon_buf_it_mpsp'+str(zn)+'_'+filename[shp]),"ogr")
-                
+            
                 z_lyr_buf_it_corr =QgsVectorLayer(processing.runalg("gdalogr:buffervectors",      #Algorithm
                 z_lyr_buf_it_mpsp,
                 'geometry',
@@ -351,14 +557,14 @@ for shp in range(0,len(input_zon)):
                 0,
                 None,
                 None)['OUTPUT_LAYER'],('zon_buf1_corr'+str(zn)+'_'+filename[shp]),"ogr")
-                
+            
                 #--- dissolve the result because some features might be ruled out
                 z_lyr_buf_it_diss = QgsVectorLayer(processing.runalg("qgis:dissolve",
                 z_lyr_buf_it_corr,
                 1,
                 'ZoneID',
                 None)['OUTPUT'], ('zon_initbuf_dissolve_'+str(zn)+'_'+filename[shp]),"ogr")
-                
+            
                 #--- recompute polyArea (needed because correction may created/deleted polygons)
                 z_lyr_buf_pa = QgsVectorLayer(processing.runalg("qgis:fieldcalculator",
                 z_lyr_buf_it_diss,
@@ -369,123 +575,66 @@ for shp in range(0,len(input_zon)):
                 1,
                 "$area * 0.000247105", #IN ACRES
                 None)['OUTPUT_LAYER'], ('zon_parea_reduced_to_'+str(round(distbuf,2))+'_Zone_'+str(zn)+'_'+filename[shp]),"ogr")
-                
+            
                 #--- Read difference area
                 buf_area   = []
                 for feature in z_lyr_buf_pa.getFeatures():
                     buf_area.append(feature["PolyArea"])
                 buf_area = sum(buf_area)
                 bufdif_area = max(0, z_area - buf_area)
+            
+                print('Area reduced to more than ' +str(round((1.-red_threshold)*100,1))+ '% of original Zone Area ')
+                print('Distance Buffer Reduced to:'+str(round(distbuf,2))+' meters')
+                print('New Reduced area is: '+str(round(bufdif_area,2))+' Acres')
+                print('Target is:'+str(round(z_area * red_threshold,2))+' Acres')
                 if distbuf == 0 or z_area == 0:
                     print('Distance buffer or Zone area equal to zero, skiping this zone')
                     skip_zone = True
                     continue
                 bf_rate = (z_area - bufdif_area) / (0 - distbuf)
-                bf_fac = (bufdif_area / z_area)                
-                break
-            
-            #--- Buffer with reduced distance
-            z_lyr_buf_it = QgsVectorLayer(processing.runalg("saga:shapesbufferfixeddistance",
+                bf_fac = (bufdif_area / z_area)
+                n_it = n_it + 1
+        
+            if skip_zone:
+                #---skip to next zone
+                continue
+            print('Buffer distance used: '+str(round(distbuf,2))+' meters')
+            #--- Compute the difference between buffer and original vector (Not necessary)
+            buf_dif = QgsVectorLayer(processing.runalg("qgis:difference",
             z_lyr_utm,
-            round(distbuf,2),
-            1,
-            5,
-            0,
-            1,
-            None)['BUFFER'], ('zon_buf2_reduced_to_'+str(round(distbuf,2))+'_Zone_'+str(zn)+'_'+filename[shp]),"ogr")
-            
-            #--- Separate single polygons to multipolygons (To correct geometries)
-            z_lyr_buf_it_mpsp =QgsVectorLayer(processing.runalg("qgis:multiparttosingleparts",      #Algorithm
-            z_lyr_buf_it,
-            None)['OUTPUT'], ('zon_buf_it_mpsp'+str(zn)+'_'+filename[shp]),"ogr")
-            
-            z_lyr_buf_it_corr =QgsVectorLayer(processing.runalg("gdalogr:buffervectors",      #Algorithm
-            z_lyr_buf_it_mpsp,
+            z_lyr_buf_pa,
+            1,        
+            None)['OUTPUT'], ('zon_reduced_shp_Zone_'+str(zn)+'_'+filename[shp]),"ogr")
+        
+            #--- Separate single polygons to multipolygons (To correct any geometries)
+            buf_dif_mpsp =QgsVectorLayer(processing.runalg("qgis:multiparttosingleparts",      #Algorithm
+            buf_dif,
+            None)['OUTPUT'], ('buf_dif_mpsp'+str(zn)+'_'+filename[shp]),"ogr")
+        
+            #--- Buffer with distance = 0 to correct geometries
+            #--- Refer to https://anitagraser.com/2017/08/29/fixing-invalid-polygon-geometries/
+            buf_dif_corr =QgsVectorLayer(processing.runalg("gdalogr:buffervectors",      #Algorithm
+            buf_dif_mpsp,
             'geometry',
             0.0,
             0,
             None,
             0,
             None,
-            None)['OUTPUT_LAYER'],('zon_buf1_corr'+str(zn)+'_'+filename[shp]),"ogr")
-            
-            #--- dissolve the result because some features might be ruled out
-            z_lyr_buf_it_diss = QgsVectorLayer(processing.runalg("qgis:dissolve",
-            z_lyr_buf_it_corr,
+            None)['OUTPUT_LAYER'],('buf_dif_corr'+str(zn)+'_'+filename[shp]),"ogr")
+        
+            #--- dissolve the result to points be included only in a single feature and not by polygon
+            buf_dif_diss = QgsVectorLayer(processing.runalg("qgis:dissolve",
+            buf_dif_corr,
             1,
             'ZoneID',
-            None)['OUTPUT'], ('zon_initbuf_dissolve_'+str(zn)+'_'+filename[shp]),"ogr")
-            
-            #--- recompute polyArea (needed because correction may created/deleted polygons)
-            z_lyr_buf_pa = QgsVectorLayer(processing.runalg("qgis:fieldcalculator",
-            z_lyr_buf_it_diss,
-            'PolyArea',
-            0,
-            15,
-            4,
-            1,
-            "$area * 0.000247105", #IN ACRES
-            None)['OUTPUT_LAYER'], ('zon_parea_reduced_to_'+str(round(distbuf,2))+'_Zone_'+str(zn)+'_'+filename[shp]),"ogr")
-            
-            #--- Read difference area
-            buf_area   = []
-            for feature in z_lyr_buf_pa.getFeatures():
-                buf_area.append(feature["PolyArea"])
-            buf_area = sum(buf_area)
-            bufdif_area = max(0, z_area - buf_area)
-            
-            print('Area reduced to more than ' +str(round((1.-red_threshold)*100,1))+ '% of original Zone Area ')
-            print('Distance Buffer Reduced to:'+str(round(distbuf,2))+' meters')
-            print('New Reduced area is: '+str(round(bufdif_area,2))+' Acres')
-            print('Target is:'+str(round(z_area * red_threshold,2))+' Acres')
-            if distbuf == 0 or z_area == 0:
-                print('Distance buffer or Zone area equal to zero, skiping this zone')
-                skip_zone = True
-                continue
-            bf_rate = (z_area - bufdif_area) / (0 - distbuf)
-            bf_fac = (bufdif_area / z_area)
-            n_it = n_it + 1
+            None)['OUTPUT'], ('buf_dif_dissolve_'+str(zn)+'_'+filename[shp]),"ogr")
         
-        if skip_zone:
-            #---skip to next zone
-            continue
-        print('Buffer distance used: '+str(round(distbuf,2))+' meters')
-        #--- Compute the difference between buffer and original vector (Not necessary)
-        buf_dif = QgsVectorLayer(processing.runalg("qgis:difference",
-        z_lyr_utm,
-        z_lyr_buf_pa,
-        1,        
-        None)['OUTPUT'], ('zon_reduced_shp_Zone_'+str(zn)+'_'+filename[shp]),"ogr")
-        
-        #--- Separate single polygons to multipolygons (To correct any geometries)
-        buf_dif_mpsp =QgsVectorLayer(processing.runalg("qgis:multiparttosingleparts",      #Algorithm
-        buf_dif,
-        None)['OUTPUT'], ('buf_dif_mpsp'+str(zn)+'_'+filename[shp]),"ogr")
-        
-        #--- Buffer with distance = 0 to correct geometries
-        #--- Refer to https://anitagraser.com/2017/08/29/fixing-invalid-polygon-geometries/
-        buf_dif_corr =QgsVectorLayer(processing.runalg("gdalogr:buffervectors",      #Algorithm
-        buf_dif_mpsp,
-        'geometry',
-        0.0,
-        0,
-        None,
-        0,
-        None,
-        None)['OUTPUT_LAYER'],('buf_dif_corr'+str(zn)+'_'+filename[shp]),"ogr")
-        
-        #--- dissolve the result to points be included only in a single feature and not by polygon
-        buf_dif_diss = QgsVectorLayer(processing.runalg("qgis:dissolve",
-        buf_dif_corr,
-        1,
-        'ZoneID',
-        None)['OUTPUT'], ('buf_dif_dissolve_'+str(zn)+'_'+filename[shp]),"ogr")
-        
-        #--- run the random points for this reduced zone
-        #--- Estimate an initial distance among points
-        ext = buf_dif_diss.extent()
-        x_dist = ext.xMaximum() - ext.xMinimum()
-        y_dist = ext.yMaximum() - ext.yMinimum()
+            #--- run the random points for this reduced zone
+            #--- Estimate an initial distance among points
+            ext = buf_dif_diss.extent()
+            x_dist = ext.xMaximum() - ext.xMinimum()
+            y_dist = ext.yMaximum() - ext.yMinimum()
         
         if y_dist == 0 or x_dist == 0:
             print('Zone '+str(zn)+' is too small, skipping to next Zone')
@@ -513,12 +662,8 @@ for shp in range(0,len(input_zon)):
         if fixed_npoints:
             npoints_zn = 0
             rp_try = 0
-            r_points_z = QgsVectorLayer(processing.runalg("qgis:randompointsinsidepolygonsfixed",
-            buf_dif_diss,
-            0,
-            npoints,
-            pdist,
-            None)['OUTPUT'], ('rpoints'+str(zn)+'_try'+str(rp_try)+'_dist_'+str(pdist)+filename[shp]),"ogr")
+            rp_nm = ('rpoints'+str(zn)+'_try'+str(rp_try)+'_dist_'+str(pdist)+filename[shp])
+            r_points_z = randomPoints(npoints, pdist, rp_nm)
             
             npoints_zn   = []
             for feature in r_points_z.getFeatures():
@@ -542,12 +687,8 @@ for shp in range(0,len(input_zon)):
                     print('Distance between points lower than minimum: '+str(p_min_dist)+' meters')
                     pdist = p_min_dist
                     force_rep = True
-                r_points_z = QgsVectorLayer(processing.runalg("qgis:randompointsinsidepolygonsfixed",
-                buf_dif_diss,
-                0,
-                npoints,
-                pdist,
-                None)['OUTPUT'], ('rpoints'+str(zn)+'_try'+str(rp_try)+'_dist_'+str(pdist)+filename[shp]),"ogr")
+                rp_nm = ('rpoints'+str(zn)+'_try'+str(rp_try)+'_dist_'+str(pdist)+filename[shp])
+                r_points_z = randomPoints(npoints, pdist, rp_nm)
                 
                 npoints_zn   = []
                 for feature in r_points_z.getFeatures():
@@ -558,12 +699,8 @@ for shp in range(0,len(input_zon)):
         
         #Reduce the points distance to better distribute on polygon area
         pdist = max(pdist * pdist_red,p_min_dist)
-        r_points_z = QgsVectorLayer(processing.runalg("qgis:randompointsinsidepolygonsfixed",
-        buf_dif_diss,
-        0,
-        npoints,
-        pdist,
-        None)['OUTPUT'], ('rpoints'+str(zn)+'_try'+str(rp_try)+'_dist_'+str(pdist)+filename[shp]),"ogr")
+        rp_nm = ('rpoints'+str(zn)+'_try'+str(rp_try)+'_dist_'+str(pdist)+filename[shp])
+        r_points_z = randomPoints(npoints, pdist, rp_nm)
         npoints_zn   = []
         for feature in r_points_z.getFeatures():
             npoints_zn.append(feature["id"])
@@ -578,12 +715,8 @@ for shp in range(0,len(input_zon)):
                 break
             print('Trying to fit points with final distance: '+str(round(pdist,1))+' meters')
             print('Attempt '+str(rp_try)+'/'+str(rp_try_red))
-            r_points_z = QgsVectorLayer(processing.runalg("qgis:randompointsinsidepolygonsfixed",
-            buf_dif_diss,
-            0,
-            npoints,
-            pdist,
-            None)['OUTPUT'], ('rpoints'+str(zn)+'_try'+str(rp_try)+'_dist_'+str(pdist)+filename[shp]),"ogr")
+            rp_nm = ('rpoints'+str(zn)+'_try'+str(rp_try)+'_dist_'+str(pdist)+filename[shp])
+            r_points_z = randomPoints(npoints, pdist, rp_nm)
             npoints_zn   = []
             for feature in r_points_z.getFeatures():
                 npoints_zn.append(feature["id"])